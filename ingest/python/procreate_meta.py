@@ -4,34 +4,59 @@ Local Procreate metadata extraction API.
 
 Commands:
   inspect <path.procreate>   - Extract metadata from a .procreate file
-  vector <path.png>          - Extract CLIP vector embedding from a thumbnail
+  vector <path.png> [--quant int8] - Extract CLIP vector embedding from a thumbnail
+  inspect-batch <listfile|-> [--jobs N] - Extract metadata for many files in parallel (JSONL output)
+  inspect-and-vectorize <path.procreate> [--keep-thumbnail] - Extract metadata and CLIP vector in one pass
+  vector-batch <path.png>... - Extract CLIP vectors for many images (JSONL output)
+  serve [--socket [path]]    - Keep CLIP loaded and answer JSONL vector requests
   clear-temp [--days N]      - Clean up old temp files
 """
 
 import sys
-import json
+import io
+import base64
+import re
 import time
+import calendar
 import tempfile
 import zipfile
 import shutil
+import os
+import mmap
+import errno
+import sqlite3
+import socket
+import socketserver
+import stat
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 import hashlib
+import plistlib
+from collections import deque
+from contextlib import contextmanager
 
+import orjson
 from PIL import Image
-import biplist
 
 # Lazy imports for CLIP (heavy dependencies)
 torch = None
 clip = None
+T = None
+tv_io = None
 
 def _ensure_clip():
-    global torch, clip
+    global torch, clip, T, tv_io
     if torch is None:
         import torch as _torch
         import clip as _clip
+        import torchvision.transforms as _T
+        import torchvision.io as _tv_io
         torch = _torch
         clip = _clip
+        T = _T
+        tv_io = _tv_io
 
 # -----------------------------------------------------------------------------
 # Config
@@ -40,90 +65,360 @@ def _ensure_clip():
 TEMP_DIR = Path(tempfile.gettempdir()) / "procreate_meta"
 TEMP_DIR.mkdir(parents=True, exist_ok=True)
 
+CLIP_SOCKET_PATH = TEMP_DIR / "clip.sock"
+
+# FP16 copy of the CLIP weights, written after the first load so later loads
+# skip clip.load's download/checksum and read half the bytes
+CLIP_WEIGHTS_CACHE = TEMP_DIR / "clip_vitb32_fp16.pt"
+
+# Index of files written to TEMP_DIR, so clean-up doesn't need to scan the dir
+TEMP_INDEX_PATH = TEMP_DIR / "index.sqlite"
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Read buffer for .procreate zips that can't be mmapped (default 8 KiB means
+# many small reads per entry)
+ZIP_BUFFER_SIZE = 1024 * 1024
+
 # CLIP model (lazy loaded)
 _clip_model = None
 _clip_preprocess = None
 _clip_device = None
+_clip_dtype = None
+_clip_autocast_dtype = None
+_clip_to_tensor = None
+_clip_tensor_transform = None
+
+# Same normalisation constants as CLIP's own preprocess
+CLIP_MEAN = (0.48145466, 0.4578275, 0.40821073)
+CLIP_STD = (0.26862954, 0.26130258, 0.27577711)
+
+# Symmetric int8 quantisation of L2-normalised vectors (values lie in [-1, 1])
+INT8_SCALE = 127.0
+
+# Images per CLIP forward in batched extraction
+CLIP_BATCH_SIZE = 16
+
+# CUDA graph for the fixed-shape single image forward (captured on first use)
+_clip_graph = None
+_clip_graph_in = None
+_clip_graph_out = None
+
+def _load_clip_weights(device: str):
+    """Build ViT-B/32 from the local FP16 weight cache, populating it on first use."""
+    if CLIP_WEIGHTS_CACHE.exists():
+        try:
+            state_dict = torch.load(CLIP_WEIGHTS_CACHE, map_location=device, mmap=True, weights_only=True)
+            model = clip.model.build_model(state_dict).to(device)
+            if device == "cpu":
+                model.float()
+            return model
+        except Exception as e:
+            print(f"Ignoring unreadable CLIP weight cache {CLIP_WEIGHTS_CACHE}: {e}", file=sys.stderr)
+
+    model, _ = clip.load("ViT-B/32", device=device)
+
+    try:
+        # Copy to FP16 without converting the live model; write atomically so
+        # a concurrent reader never sees a partial file
+        state_dict = {k: v.half() for k, v in model.state_dict().items()}
+        tmp_path = CLIP_WEIGHTS_CACHE.with_suffix(f".{os.getpid()}.tmp")
+        torch.save(state_dict, tmp_path)
+        os.replace(tmp_path, CLIP_WEIGHTS_CACHE)
+    except Exception as e:
+        print(f"Could not write CLIP weight cache {CLIP_WEIGHTS_CACHE}: {e}", file=sys.stderr)
+
+    return model
 
 def get_clip_model():
     """Lazy-load CLIP model on first use."""
-    global _clip_model, _clip_preprocess, _clip_device
+    global _clip_model, _clip_preprocess, _clip_device, _clip_dtype, _clip_autocast_dtype
+    global _clip_to_tensor, _clip_tensor_transform
     _ensure_clip()
     if _clip_model is None:
         _clip_device = "cuda" if torch.cuda.is_available() else "cpu"
-        _clip_model, _clip_preprocess = clip.load("ViT-B/32", device=_clip_device)
+        _clip_model = _load_clip_weights(_clip_device)
         _clip_model.eval()
+
+        # Replace CLIP's PIL-based preprocess with tensor ops that run on the
+        # model's device: only the uint8 conversion happens on the PIL image
+        size = _clip_model.visual.input_resolution
+        _clip_to_tensor = T.PILToTensor()
+        _clip_tensor_transform = T.Compose([
+            T.ConvertImageDtype(torch.float32),
+            T.Resize(size, interpolation=T.InterpolationMode.BICUBIC, antialias=True),
+            T.CenterCrop(size),
+            T.Normalize(mean=CLIP_MEAN, std=CLIP_STD),
+        ])
+        _clip_preprocess = preprocess_image
+        if _clip_device == "cuda":
+            # FP16 weights + inputs use tensor cores
+            _clip_model.half()
+            _clip_dtype = torch.float16
+            _clip_autocast_dtype = torch.float16
+        else:
+            # Keep FP32 weights on CPU, let autocast run matmuls in BF16
+            _clip_dtype = torch.float32
+            _clip_autocast_dtype = torch.bfloat16
     return _clip_model, _clip_preprocess, _clip_device
 
+def preprocess_image(image: "Image.Image") -> "torch.Tensor":
+    """Convert an RGB image into a normalised [3, H, W] tensor on the CLIP device."""
+    return preprocess_tensor(_clip_to_tensor(image))
+
+def decode_image_data(data: bytes) -> "torch.Tensor":
+    """
+    Decode PNG/JPEG bytes straight into a uint8 [3, H, W] tensor with
+    torchvision's libpng/libjpeg decoders, falling back to PIL for anything
+    they can't handle.
+    """
+    try:
+        encoded = torch.frombuffer(bytearray(data), dtype=torch.uint8)
+        return tv_io.decode_image(encoded, mode=tv_io.ImageReadMode.RGB)
+    except RuntimeError:
+        return _clip_to_tensor(Image.open(io.BytesIO(data)).convert("RGB"))
+
+def preprocess_tensor(tensor: "torch.Tensor") -> "torch.Tensor":
+    """Resize/crop/normalise a uint8 [3, H, W] tensor on the CLIP device."""
+    tensor = tensor.to(_clip_device, non_blocking=True)
+    return _clip_tensor_transform(tensor)
+
 # -----------------------------------------------------------------------------
 # Helpers
 # -----------------------------------------------------------------------------
 
+def dumps(obj: Any) -> bytes:
+    """Serialise to compact UTF-8 JSON; numpy arrays (CLIP vectors) are written natively."""
+    return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+
+def emit(obj: Any):
+    """Write one JSON line to stdout."""
+    sys.stdout.buffer.write(dumps(obj) + b"\n")
+    sys.stdout.flush()
+
 def cfuid(obj):
-    """Resolve CF$UID references. Handles both dict and Uid object formats."""
-    if isinstance(obj, dict) and "CF$UID" in obj:
-        return obj["CF$UID"]
-    # biplist returns Uid objects directly in some versions
-    if hasattr(obj, '__class__') and obj.__class__.__name__ == 'Uid':
-        return int(obj)
-    if isinstance(obj, biplist.Uid):
-        return int(obj)
-    return None
+    """Return the integer of a keyed-archive UID reference, or None."""
+    return obj.data if isinstance(obj, plistlib.UID) else None
 
 def resolve(objects, value):
+    """Follow a UID reference into $objects; the "$null" sentinel resolves to None."""
     uid = cfuid(value)
-    return objects[uid] if uid is not None else value
+    if uid is None:
+        return value
+    obj = objects[uid]
+    return None if obj == "$null" else obj
+
+class _MmapFile(io.RawIOBase):
+    """
+    Minimal read-only file object over an mmap (mmap has no seekable() before
+    3.13). Keeps its own position so seeks behave like a real file: past the
+    end is allowed, before the start raises OSError (which zipfile relies on
+    when probing for the end-of-central-directory record).
+    """
+
+    def __init__(self, mm: mmap.mmap):
+        self._mm = mm
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._mm) if size is None or size < 0 else self._pos + size
+        data = self._mm[self._pos:end]
+        self._pos += len(data)
+        return data
+
+    def readinto(self, b) -> int:
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = len(self._mm) + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+
+        if pos < 0:
+            raise OSError(errno.EINVAL, "Invalid argument")
+
+        self._pos = pos
+        return pos
+
+    def tell(self) -> int:
+        return self._pos
+
+@contextmanager
+def open_procreate_zip(path: Path):
+    """
+    Open a .procreate zip backed by an mmap of the file, so entry reads are
+    served from the page cache instead of read() syscalls through a buffer.
+
+    Trade-off: if the file is truncated while mapped (e.g. still syncing when
+    the watcher picks it up), touching the missing pages raises SIGBUS and
+    kills the process instead of raising an exception.
+    """
+    with open(path, "rb", buffering=ZIP_BUFFER_SIZE) as fh:
+        try:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty files (and filesystems without mmap) use the buffered handle
+            mm = None
+
+        if mm is None:
+            with zipfile.ZipFile(fh, "r") as zf:
+                yield zf
+            return
+
+        with mm, zipfile.ZipFile(_MmapFile(mm), "r") as zf:
+            yield zf
+
+_temp_index = None
+
+def get_temp_index() -> sqlite3.Connection:
+    """
+    Lazy-open the temp index (temp file list + file hash cache), backfilling
+    the file list from TEMP_DIR on creation.
+    """
+    global _temp_index
+    if _temp_index is None:
+        is_new = not TEMP_INDEX_PATH.exists()
+        conn = sqlite3.connect(TEMP_INDEX_PATH, isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS files_mtime ON files (mtime)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            "dev INTEGER NOT NULL, ino INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL, "
+            "sha256 TEXT NOT NULL, PRIMARY KEY (dev, ino, mtime_ns, size))"
+        )
+
+        if is_new:
+            # Pick up thumbnails written before the index existed
+            with os.scandir(TEMP_DIR) as entries:
+                rows = [
+                    (entry.path, entry.stat().st_mtime)
+                    for entry in entries
+                    if entry.name.endswith(".png")
+                ]
+            conn.executemany("INSERT OR REPLACE INTO files (path, mtime) VALUES (?, ?)", rows)
+
+        _temp_index = conn
+    return _temp_index
+
+def track_temp_file(path: Path):
+    get_temp_index().execute(
+        "INSERT OR REPLACE INTO files (path, mtime) VALUES (?, ?)",
+        (str(path), time.time()),
+    )
 
 def compute_sha256(path: Path, chunk_size: int = 1024 * 1024) -> str:
-    sha = hashlib.sha256()
+    """
+    SHA-256 of a file, cached by (device, inode, mtime, size) so re-inspecting
+    an unchanged file skips re-reading it.
+    """
+    st = path.stat()
+    key = (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+
+    index = get_temp_index()
+    row = index.execute(
+        "SELECT sha256 FROM hashes WHERE dev = ? AND ino = ? AND mtime_ns = ? AND size = ?", key
+    ).fetchone()
+    if row:
+        return row[0]
+
+    digest = _hash_file(path, chunk_size)
+
+    # Only cache if the file didn't change while it was being hashed
+    st = path.stat()
+    if key == (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size):
+        # Keep one row per inode: drop digests of earlier versions of this file
+        index.execute("BEGIN")
+        index.execute("DELETE FROM hashes WHERE dev = ? AND ino = ?", key[:2])
+        index.execute(
+            "INSERT OR REPLACE INTO hashes (dev, ino, mtime_ns, size, sha256) VALUES (?, ?, ?, ?, ?)",
+            key + (digest,),
+        )
+        index.execute("COMMIT")
+
+    return digest
+
+def _hash_file(path: Path, chunk_size: int) -> str:
     with path.open("rb") as f:
+        # Python 3.11+: read/update loop runs in C (OpenSSL, SHA-NI where available)
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256").hexdigest()
+
+        sha = hashlib.sha256()
         for chunk in iter(lambda: f.read(chunk_size), b""):
             sha.update(chunk)
-    return sha.hexdigest()
+        return sha.hexdigest()
 
 # -----------------------------------------------------------------------------
 # NSKeyedArchive parsing
 # -----------------------------------------------------------------------------
 
-def parse_document_archive(data: bytes, zf: "zipfile.ZipFile | None" = None) -> Dict[str, Any]:
-    plist = biplist.readPlistFromString(data)
+# Apple NSStringFromCGSize format, e.g. "{2048, 1536}"
+_SIZE_RE = re.compile(r"\{\s*([0-9.]+)\s*,\s*([0-9.]+)\s*\}")
+
+def parse_size_string(value: str) -> Optional[Tuple[int, int]]:
+    """Parse an Apple "{width, height}" size string."""
+    m = _SIZE_RE.match(value)
+    if not m:
+        return None
+    try:
+        return int(float(m.group(1))), int(float(m.group(2)))
+    except ValueError:
+        return None
+
+def parse_document_archive(
+    data: bytes, infos: "Dict[str, zipfile.ZipInfo] | None" = None
+) -> Dict[str, Any]:
+    plist = plistlib.loads(data, fmt=plistlib.FMT_BINARY)
 
     objects = plist["$objects"]
     top = plist["$top"]
-    
-    # Handle both dict {"CF$UID": int} and Uid object formats
+
     root_ref = top["root"]
     root_uid = cfuid(root_ref)
     if root_uid is None:
         raise RuntimeError(f"Could not resolve root UID from: {root_ref}")
     root = objects[root_uid]
+    if not isinstance(root, dict):
+        raise RuntimeError(f"Unexpected root object type: {type(root).__name__}")
+
+    # Only the handful of fields read below are dereferenced, on access
+    def field(key: str):
+        return resolve(objects, root.get(key))
 
     meta = {}
 
     # Canvas size - try both old and new key names
     # Old format: canvasSize -> {width, height}
     # New format: size -> resolve to get {width, height} or "{width, height}" string
-    canvas = resolve(objects, root.get("canvasSize") or root.get("size"))
+    canvas = field("canvasSize") or field("size")
     if isinstance(canvas, dict):
-        meta["canvas_width"] = int(canvas.get("width", 0))
-        meta["canvas_height"] = int(canvas.get("height", 0))
+        meta["canvas_width"] = int(resolve(objects, canvas.get("width")) or 0)
+        meta["canvas_height"] = int(resolve(objects, canvas.get("height")) or 0)
     elif isinstance(canvas, str):
         # Parse "{width, height}" format
-        try:
-            clean = canvas.strip("{}")
-            parts = [p.strip() for p in clean.split(",")]
-            if len(parts) == 2:
-                meta["canvas_width"] = int(float(parts[0]))
-                meta["canvas_height"] = int(float(parts[1]))
-        except:
-            meta["canvas_width"] = 0
-            meta["canvas_height"] = 0
+        size = parse_size_string(canvas)
+        meta["canvas_width"], meta["canvas_height"] = size if size else (0, 0)
     else:
         meta["canvas_width"] = 0
         meta["canvas_height"] = 0
 
     # DPI - try both old and new key names
-    dpi = root.get("dpi") or root.get("SilicaDocumentArchiveDPIKey")
+    dpi = field("dpi") or field("SilicaDocumentArchiveDPIKey")
     meta["dpi"] = int(dpi) if dpi else 0
 
     # Orientation
@@ -132,15 +427,14 @@ def parse_document_archive(data: bytes, zf: "zipfile.ZipFile | None" = None) ->
         2: "landscape",
     }
     meta["orientation"] = orientation_map.get(
-        root.get("orientation"), "unknown"
+        field("orientation"), "unknown"
     )
 
     # Layer count - try old key or count layers array
-    layer_count = root.get("layerCount")
+    layer_count = field("layerCount")
     if layer_count is None:
-        layers_ref = root.get("layers")
-        if layers_ref:
-            layers = resolve(objects, layers_ref)
+        layers = field("layers")
+        if layers:
             if isinstance(layers, dict) and "NS.objects" in layers:
                 layer_count = len(layers["NS.objects"])
             elif isinstance(layers, list):
@@ -148,30 +442,26 @@ def parse_document_archive(data: bytes, zf: "zipfile.ZipFile | None" = None) ->
     meta["layer_count"] = int(layer_count) if layer_count else 0
 
     # Time spent drawing (seconds) - try both old and new key names
-    time_spent = root.get("timeSpentDrawing") or root.get("SilicaDocumentTrackedTimeKey")
+    time_spent = field("timeSpentDrawing") or field("SilicaDocumentTrackedTimeKey")
     meta["time_spent"] = int(time_spent) if time_spent else 0
 
     # Color profile - try multiple approaches
     color_profile = None
-    color_ref = root.get("colorProfile")
-    if color_ref:
-        color = resolve(objects, color_ref)
+    color = field("colorProfile")
+    if color:
         if isinstance(color, dict):
             # Try various keys used in different Procreate versions
-            icc_name_ref = color.get("SiColorProfileArchiveICCNameKey")
-            if icc_name_ref is not None:
-                # Might be a direct string or a reference
-                resolved_name = resolve(objects, icc_name_ref)
-                if isinstance(resolved_name, str):
-                    color_profile = resolved_name
+            icc_name = resolve(objects, color.get("SiColorProfileArchiveICCNameKey"))
+            if isinstance(icc_name, str):
+                color_profile = icc_name
             if not color_profile:
-                color_profile = color.get("name") or color.get("iccName")
+                color_profile = resolve(objects, color.get("name")) or resolve(objects, color.get("iccName"))
         elif isinstance(color, str):
             color_profile = color
     meta["color_profile"] = color_profile
 
     # Procreate version - might be in different locations
-    meta["procreate_version"] = root.get("appVersion") or root.get("version")
+    meta["procreate_version"] = field("appVersion") or field("version")
 
     # Dates (Apple absolute time → unix)
     def apple_time_to_unix(val: Optional[float]) -> Optional[int]:
@@ -181,14 +471,14 @@ def parse_document_archive(data: bytes, zf: "zipfile.ZipFile | None" = None) ->
 
     # Try multiple date key names
     created = (
-        root.get("creationDate") or 
-        root.get("SilicaDocumentArchiveCreationDateKey") or
-        root.get("documentCreationDate")
+        field("creationDate") or 
+        field("SilicaDocumentArchiveCreationDateKey") or
+        field("documentCreationDate")
     )
     modified = (
-        root.get("lastModifiedDate") or 
-        root.get("SilicaDocumentArchiveModificationDateKey") or
-        root.get("modificationDate")
+        field("lastModifiedDate") or 
+        field("SilicaDocumentArchiveModificationDateKey") or
+        field("modificationDate")
     )
     
     meta["created_at"] = apple_time_to_unix(created)
@@ -196,27 +486,15 @@ def parse_document_archive(data: bytes, zf: "zipfile.ZipFile | None" = None) ->
     
     # Fallback: use zip file timestamps if plist doesn't have them
     # Prefer QuickLook/Thumbnail.png mtime as it's updated on each save
-    if zf is not None and (meta["created_at"] is None or meta["updated_at"] is None):
-        import datetime
+    if infos is not None and (meta["created_at"] is None or meta["updated_at"] is None):
         zip_timestamp = None
-        
-        # Try QuickLook/Thumbnail.png first (most reliable for modification time)
-        try:
-            info = zf.getinfo("QuickLook/Thumbnail.png")
-            dt = datetime.datetime(*info.date_time)
-            zip_timestamp = int(dt.timestamp())
-        except KeyError:
-            pass
-        
-        # Fallback to Document.archive if thumbnail not found
-        if zip_timestamp is None:
-            try:
-                info = zf.getinfo("Document.archive")
-                dt = datetime.datetime(*info.date_time)
-                zip_timestamp = int(dt.timestamp())
-            except:
-                pass
-        
+
+        # Try QuickLook/Thumbnail.png first (most reliable for modification time),
+        # then fall back to Document.archive
+        info = infos.get("QuickLook/Thumbnail.png") or infos.get("Document.archive")
+        if info is not None:
+            zip_timestamp = calendar.timegm(info.date_time + (0, 0, 0))
+
         if zip_timestamp is not None:
             if meta["created_at"] is None:
                 meta["created_at"] = zip_timestamp
@@ -234,84 +512,400 @@ def parse_document_archive(data: bytes, zf: "zipfile.ZipFile | None" = None) ->
 # Thumbnail extraction
 # -----------------------------------------------------------------------------
 
-def extract_thumbnail(zf: zipfile.ZipFile, procreate_path: Path) -> Optional[str]:
-    try:
-        data = zf.read("QuickLook/Thumbnail.png")
-    except KeyError:
-        return None
+def extract_thumbnail(
+    zf: zipfile.ZipFile,
+    procreate_path: Path,
+    persist: bool = True,
+    infos: "Dict[str, zipfile.ZipInfo] | None" = None,
+) -> Tuple[Optional[bytes], Optional[str]]:
+    """
+    Read the QuickLook thumbnail. Returns (png_bytes, temp_path); temp_path is
+    only set when persist is True.
+    """
+    if infos is None:
+        infos = {info.filename: info for info in zf.infolist()}
+
+    info = infos.get("QuickLook/Thumbnail.png")
+    if info is None:
+        return None, None
 
-    out_path = TEMP_DIR / f"{procreate_path.stem}_{int(time.time())}.png"
+    # zipfile already checks the entry's CRC-32 on read, so only sanity
+    # check that it really is a PNG rather than re-parsing every chunk
+    data = zf.read(info)
+    if data[:8] != PNG_SIGNATURE:
+        raise RuntimeError(f"Thumbnail is not a PNG: {procreate_path}")
+
+    if not persist:
+        return data, None
+
+    # Include the pid so parallel inspect-batch workers never share a name
+    out_path = TEMP_DIR / f"{procreate_path.stem}_{time.time_ns()}_{os.getpid()}.png"
     with open(out_path, "wb") as f:
         f.write(data)
+    track_temp_file(out_path)
 
-    # Validate image
-    Image.open(out_path).verify()
-
-    return str(out_path)
+    return data, str(out_path)
 
 # -----------------------------------------------------------------------------
 # API commands
 # -----------------------------------------------------------------------------
 
-def inspect_procreate(path: Path):
+def read_procreate(path: Path, persist_thumbnail: bool = True) -> Tuple[Dict[str, Any], Optional[bytes]]:
+    """
+    Extract metadata from a .procreate file. Returns (meta, thumbnail_png_bytes).
+    The thumbnail is only written to TEMP_DIR when persist_thumbnail is True.
+    """
     if not path.exists() or path.suffix.lower() != ".procreate":
         raise RuntimeError("Invalid .procreate file")
 
-    with zipfile.ZipFile(path, "r") as zf:
-        archive_data = zf.read("Document.archive")
-        meta = parse_document_archive(archive_data, zf)
-        thumb_path = extract_thumbnail(zf, path)
+    with open_procreate_zip(path) as zf:
+        # Build the central directory lookup once and share it
+        infos = {info.filename: info for info in zf.infolist()}
+        if "Document.archive" not in infos:
+            raise RuntimeError("Invalid .procreate file: missing Document.archive")
+
+        archive_data = zf.read(infos["Document.archive"])
+        meta = parse_document_archive(archive_data, infos)
+        thumb_data, thumb_path = extract_thumbnail(zf, path, persist=persist_thumbnail, infos=infos)
 
     meta["thumbnail_path"] = thumb_path
     meta["source_path"] = str(path)
     meta["file_hash"] = compute_sha256(path)
 
-    print(json.dumps(meta, separators=(",", ":"), ensure_ascii=False))
+    return meta, thumb_data
+
+def inspect_procreate(path: Path):
+    meta, _ = read_procreate(path)
+
+    emit(meta)
+
+def _inspect_one(path: str) -> bytes:
+    """inspect-batch worker: returns one JSON line, reporting failures inline."""
+    try:
+        meta, _ = read_procreate(Path(path))
+    except Exception as e:
+        meta = {"source_path": path, "error": str(e)}
+
+    return dumps(meta)
+
+def inspect_batch(paths: List[str], jobs: Optional[int] = None):
+    """Inspect many .procreate files across a process pool, one JSON line per file."""
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        for line in pool.map(_inspect_one, paths, chunksize=16):
+            sys.stdout.buffer.write(line + b"\n")
+            sys.stdout.flush()
+
+def inspect_and_vector(path: Path, keep_thumbnail: bool = False):
+    """
+    Extract metadata and the thumbnail's CLIP vector, decoding the PNG only once.
+    The thumbnail stays in memory unless keep_thumbnail asks for a temp copy.
+    """
+    meta, thumb_data = read_procreate(path, persist_thumbnail=keep_thumbnail)
+
+    vector = None
+    if thumb_data is not None:
+        vector = vector_from_data(thumb_data)
+
+    meta["vector"] = vector
+    meta["dimensions"] = vector.size if vector is not None else 0
+
+    emit(meta)
 
 def clear_temp(days: int):
     cutoff = time.time() - days * 86400
     removed = 0
 
-    for file in TEMP_DIR.glob("*.png"):
-        if file.stat().st_mtime < cutoff:
-            file.unlink()
+    index = get_temp_index()
+    expired = [row[0] for row in index.execute("SELECT path FROM files WHERE mtime < ?", (cutoff,))]
+
+    for file in expired:
+        try:
+            os.unlink(file)
             removed += 1
+        except FileNotFoundError:
+            # Already moved away by the ingest service
+            pass
+
+    index.executemany("DELETE FROM files WHERE path = ?", [(file,) for file in expired])
 
-    print(json.dumps({
+    # Prune superseded hash rows (older mtimes of the same inode)
+    index.execute(
+        "DELETE FROM hashes WHERE EXISTS ("
+        "SELECT 1 FROM hashes AS newer WHERE newer.dev = hashes.dev AND newer.ino = hashes.ino "
+        "AND newer.mtime_ns > hashes.mtime_ns)"
+    )
+
+    emit({
         "removed": removed,
         "temp_dir": str(TEMP_DIR)
-    }))
+    })
 
 
 # -----------------------------------------------------------------------------
 # CLIP Vector Extraction
 # -----------------------------------------------------------------------------
 
-def extract_vector(image_path: Path) -> List[float]:
+def _encode_single_cuda_graph(batch: "torch.Tensor") -> "torch.Tensor":
+    """
+    Replay a captured CUDA graph for the [1, 3, H, W] forward. The shape never
+    changes, so launch overhead drops to a single graph replay per image.
+    """
+    global _clip_graph, _clip_graph_in, _clip_graph_out
+    model, _, _ = get_clip_model()
+
+    with torch.inference_mode():
+        if _clip_graph is None:
+            _clip_graph_in = torch.empty_like(batch, memory_format=torch.channels_last)
+            _clip_graph_in.copy_(batch)
+
+            # Warm up on a side stream before capture, as required by CUDA graphs
+            stream = torch.cuda.Stream()
+            stream.wait_stream(torch.cuda.current_stream())
+            with torch.cuda.stream(stream):
+                for _ in range(3):
+                    model.encode_image(_clip_graph_in)
+            torch.cuda.current_stream().wait_stream(stream)
+
+            # Model is already FP16 on CUDA, so no autocast inside the graph
+            graph = torch.cuda.CUDAGraph()
+            with torch.cuda.graph(graph):
+                _clip_graph_out = model.encode_image(_clip_graph_in)
+            _clip_graph = graph
+
+        _clip_graph_in.copy_(batch)
+        _clip_graph.replay()
+
+        return _clip_graph_out.clone()
+
+
+def encode_images(batch: "torch.Tensor") -> "torch.Tensor":
+    """Run a preprocessed [B, 3, H, W] batch through CLIP and return L2-normalised FP32 embeddings."""
+    model, _, device = get_clip_model()
+
+    batch = batch.to(device, dtype=_clip_dtype, memory_format=torch.channels_last, non_blocking=True)
+
+    if device == "cuda" and batch.shape[0] == 1:
+        embedding = _encode_single_cuda_graph(batch)
+    else:
+        with torch.inference_mode(), torch.autocast(device_type=device, dtype=_clip_autocast_dtype):
+            embedding = model.encode_image(batch)
+
+    # Normalise in FP32 for numerical stability
+    embedding = embedding.float()
+    return embedding / embedding.norm(dim=-1, keepdim=True)
+
+
+def vector_from_data(data: bytes) -> "numpy.ndarray":
+    """Extract CLIP vector embedding from encoded image bytes."""
+    get_clip_model()
+
+    embedding = encode_images(preprocess_tensor(decode_image_data(data)).unsqueeze(0))
+
+    return embedding.squeeze(0).cpu().numpy()
+
+
+def extract_vector(image_path: Path) -> "numpy.ndarray":
     """Extract CLIP vector embedding from an image file."""
     if not image_path.exists():
         raise RuntimeError(f"Image not found: {image_path}")
 
-    model, preprocess, device = get_clip_model()
+    return vector_from_data(image_path.read_bytes())
+
+
+def extract_vectors(image_paths: List[Path]) -> "numpy.ndarray":
+    """
+    Extract CLIP vector embeddings for many images, CLIP_BATCH_SIZE per forward.
+
+    On CUDA, each chunk is uploaded on a separate copy stream from pinned
+    memory, so the upload of chunk N+1 overlaps the forward of chunk N.
+    Decoding runs at most two chunks ahead, which bounds pinned memory.
+    Embeddings stay on the device until the end to avoid a sync per chunk.
+    """
+    for image_path in image_paths:
+        if not image_path.exists():
+            raise RuntimeError(f"Image not found: {image_path}")
+
+    model, _, device = get_clip_model()
+
+    if not image_paths:
+        return torch.empty((0, model.visual.output_dim)).numpy()
+
+    copy_stream = torch.cuda.Stream() if device == "cuda" else None
+
+    def load(image_path: Path):
+        tensor = decode_image_data(image_path.read_bytes())
+        return tensor.pin_memory() if copy_stream is not None else tensor
 
-    image = Image.open(image_path).convert("RGB")
-    img_tensor = preprocess(image).unsqueeze(0).to(device)
+    def encode_chunk(chunk: List["torch.Tensor"]) -> "torch.Tensor":
+        if copy_stream is not None:
+            compute_stream = torch.cuda.current_stream()
+            with torch.cuda.stream(copy_stream):
+                chunk = [t.to(device, non_blocking=True) for t in chunk]
+            compute_stream.wait_stream(copy_stream)
+            # Tensors allocated on the copy stream are consumed on the compute stream
+            for t in chunk:
+                t.record_stream(compute_stream)
 
-    with torch.no_grad():
-        embedding = model.encode_image(img_tensor)
-        embedding = embedding / embedding.norm(dim=-1, keepdim=True)
+        # Thumbnails differ in size, so resize on-device before stacking
+        return encode_images(torch.stack([preprocess_tensor(t) for t in chunk]))
 
-    return embedding.squeeze().cpu().tolist()
+    embeddings = []
 
+    # Image decoding releases the GIL, so threads decode ahead of the GPU,
+    # in a sliding window of two chunks
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+        remaining = iter(image_paths)
+        window = deque()
 
-def vector_command(path: Path):
+        def fill_window():
+            while len(window) < 2 * CLIP_BATCH_SIZE:
+                image_path = next(remaining, None)
+                if image_path is None:
+                    return
+                window.append(pool.submit(load, image_path))
+
+        chunk = []
+        fill_window()
+        while window:
+            chunk.append(window.popleft().result())
+            fill_window()
+            if len(chunk) == CLIP_BATCH_SIZE:
+                embeddings.append(encode_chunk(chunk))
+                chunk = []
+        if chunk:
+            embeddings.append(encode_chunk(chunk))
+
+    return torch.cat(embeddings).cpu().numpy()
+
+
+def quantize_int8(vector: "numpy.ndarray") -> bytes:
+    """Quantise a normalised vector to int8; multiply by 1 / INT8_SCALE to recover it."""
+    return (vector * INT8_SCALE).round().clip(-127, 127).astype("int8").tobytes()
+
+
+def vector_command(path: Path, quant: Optional[str] = None):
     """CLI handler for vector extraction."""
     vector = extract_vector(path)
-    print(json.dumps({
+
+    if quant == "int8":
+        emit({
+            "vector_int8": base64.b64encode(quantize_int8(vector)).decode("ascii"),
+            "scale": 1 / INT8_SCALE,
+            "source_path": str(path),
+            "dimensions": vector.size
+        })
+        return
+
+    emit({
         "vector": vector,
         "source_path": str(path),
-        "dimensions": len(vector)
-    }, separators=(",", ":"), ensure_ascii=False))
+        "dimensions": vector.size
+    })
+
+
+def vector_batch_command(paths: List[Path]):
+    """CLI handler for batched vector extraction. Emits one JSON line per image."""
+    vectors = extract_vectors(paths)
+    for path, vector in zip(paths, vectors):
+        emit({
+            "vector": vector,
+            "source_path": str(path),
+            "dimensions": vector.size
+        })
+
+# -----------------------------------------------------------------------------
+# Persistent CLIP worker
+# -----------------------------------------------------------------------------
+
+# Serialises access to the model when several socket clients share one worker
+_clip_lock = threading.Lock()
+
+def handle_vector_request(line: str) -> bytes:
+    """Handle one JSONL request of the form {"path": "..."} and return a JSON line."""
+    req_id = None
+    try:
+        req = orjson.loads(line)
+        req_id = req.get("id")
+        path = Path(req["path"])
+        with _clip_lock:
+            vector = extract_vector(path)
+        resp = {
+            "vector": vector,
+            "source_path": str(path),
+            "dimensions": vector.size
+        }
+    except Exception as e:
+        resp = {"error": str(e)}
+
+    if req_id is not None:
+        resp["id"] = req_id
+
+    return dumps(resp) + b"\n"
+
+
+class _VectorRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for raw in self.rfile:
+            line = raw.decode("utf-8").strip()
+            if not line:
+                continue
+            self.wfile.write(handle_vector_request(line))
+            self.wfile.flush()
+
+
+class _VectorSocketServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def release_stale_socket(socket_path: Path):
+    """
+    Remove a leftover socket from a worker that exited without cleaning up.
+    Refuses to touch non-socket files or a socket another worker is serving.
+    """
+    try:
+        mode = socket_path.lstat().st_mode
+    except FileNotFoundError:
+        return
+
+    if not stat.S_ISSOCK(mode):
+        raise RuntimeError(f"Refusing to replace non-socket file: {socket_path}")
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(str(socket_path))
+        except (ConnectionRefusedError, FileNotFoundError):
+            socket_path.unlink(missing_ok=True)
+            return
+
+    raise RuntimeError(f"Another worker is already listening on {socket_path}")
+
+
+def serve_command(socket_path: Optional[Path] = None):
+    """
+    Load CLIP once and answer vector requests until stdin (or the server) closes.
+    Reads newline-delimited JSON from stdin, or from a Unix socket when given.
+    """
+    if socket_path is not None:
+        # Before loading CLIP, so a refused start fails fast
+        release_stale_socket(socket_path)
+
+    get_clip_model()
+
+    if socket_path is None:
+        for raw in sys.stdin:
+            line = raw.strip()
+            if not line:
+                continue
+            sys.stdout.buffer.write(handle_vector_request(line))
+            sys.stdout.flush()
+        return
+
+    with _VectorSocketServer(str(socket_path), _VectorRequestHandler) as server:
+        print(f"Listening on {socket_path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        finally:
+            socket_path.unlink(missing_ok=True)
 
 # -----------------------------------------------------------------------------
 # Entrypoint
@@ -322,16 +916,17 @@ def debug_procreate(path: Path):
     if not path.exists() or path.suffix.lower() != ".procreate":
         raise RuntimeError("Invalid .procreate file")
 
-    with zipfile.ZipFile(path, "r") as zf:
+    with open_procreate_zip(path) as zf:
+        infos = {info.filename: info for info in zf.infolist()}
+
         # Show all files in the archive
         print("=== Files in archive ===")
-        for name in zf.namelist():
-            info = zf.getinfo(name)
+        for name, info in infos.items():
             print(f"  {name} (modified: {info.date_time})")
         print()
         
         archive_data = zf.read("Document.archive")
-        plist = biplist.readPlistFromString(archive_data)
+        plist = plistlib.loads(archive_data, fmt=plistlib.FMT_BINARY)
 
         objects = plist["$objects"]
         top = plist["$top"]
@@ -416,9 +1011,9 @@ def debug_procreate(path: Path):
         print("=== Checking for other metadata sources ===")
         try:
             # Some procreate files have a separate metadata plist
-            if "Metadata.plist" in zf.namelist():
+            if "Metadata.plist" in infos:
                 meta_data = zf.read("Metadata.plist")
-                meta_plist = biplist.readPlistFromString(meta_data)
+                meta_plist = plistlib.loads(meta_data)
                 print("Found Metadata.plist:")
                 print(f"  Keys: {list(meta_plist.keys()) if isinstance(meta_plist, dict) else 'N/A'}")
                 for k, v in meta_plist.items():
@@ -431,11 +1026,41 @@ def debug_procreate(path: Path):
         # Show zip file modification time as fallback
         print()
         print("=== Zip file timestamps (fallback) ===")
-        try:
-            info = zf.getinfo("Document.archive")
+        info = infos.get("Document.archive")
+        if info is not None:
             print(f"Document.archive date_time: {info.date_time}")
-        except Exception as e:
-            print(f"Error getting zip timestamps: {e}")
+        else:
+            print("Error getting zip timestamps: Document.archive not found")
+
+
+def split_flags(args: List[str], value_flags: Tuple[str, ...] = (), bool_flags: Tuple[str, ...] = ()):
+    """
+    Split CLI args into (positional, flags). Flags may appear anywhere; value
+    flags take the next argument. Prints an error and exits on bad input.
+    """
+    positional: List[str] = []
+    flags: Dict[str, Any] = {}
+
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in value_flags:
+            if i + 1 >= len(args) or args[i + 1].startswith("--"):
+                print(f"Error: {arg} requires a value")
+                sys.exit(1)
+            flags[arg] = args[i + 1]
+            i += 2
+            continue
+        if arg in bool_flags:
+            flags[arg] = True
+        elif arg.startswith("--"):
+            print(f"Error: unknown option {arg}")
+            sys.exit(1)
+        else:
+            positional.append(arg)
+        i += 1
+
+    return positional, flags
 
 
 def main():
@@ -443,8 +1068,12 @@ def main():
         print("Usage: procreate_meta.py <command> [args]")
         print("Commands:")
         print("  inspect <file.procreate>  - Extract metadata from a .procreate file")
+        print("  inspect-batch <listfile|-> [--jobs N] - Inspect newline-separated paths in parallel (JSONL)")
+        print("  inspect-and-vectorize <file.procreate> [--keep-thumbnail] - Metadata + CLIP vector in one pass")
         print("  debug <file.procreate>    - Debug: show raw plist structure")
-        print("  vector <image.png>        - Extract CLIP vector embedding from an image")
+        print("  vector <image.png> [--quant int8] - Extract CLIP vector embedding from an image")
+        print("  vector-batch <image.png>... - Extract CLIP vectors for many images (JSONL)")
+        print("  serve [--socket [path]]   - Keep CLIP loaded, answer {\"path\": ...} JSONL on stdin/socket")
         print("  clear-temp [days]         - Clean up temp files older than N days (default: 7)")
         sys.exit(1)
 
@@ -455,16 +1084,63 @@ def main():
             print("Error: inspect requires a file path")
             sys.exit(1)
         inspect_procreate(Path(sys.argv[2]))
+    elif cmd == "inspect-batch":
+        args, flags = split_flags(sys.argv[2:], value_flags=("--jobs",))
+        if not args:
+            print("Error: inspect-batch requires a list file (or - for stdin)")
+            sys.exit(1)
+        jobs = None
+        if "--jobs" in flags:
+            try:
+                jobs = int(flags["--jobs"])
+            except ValueError:
+                jobs = 0
+            if jobs < 1:
+                print("Error: --jobs must be a positive integer")
+                sys.exit(1)
+        if args[0] == "-":
+            lines = sys.stdin.read().splitlines()
+        else:
+            lines = Path(args[0]).read_text(encoding="utf-8").splitlines()
+        inspect_batch([line.strip() for line in lines if line.strip()], jobs)
+    elif cmd == "inspect-and-vectorize":
+        args, flags = split_flags(sys.argv[2:], bool_flags=("--keep-thumbnail",))
+        if not args:
+            print("Error: inspect-and-vectorize requires a file path")
+            sys.exit(1)
+        inspect_and_vector(Path(args[0]), keep_thumbnail=flags.get("--keep-thumbnail", False))
     elif cmd == "debug":
         if len(sys.argv) < 3:
             print("Error: debug requires a file path")
             sys.exit(1)
         debug_procreate(Path(sys.argv[2]))
     elif cmd == "vector":
-        if len(sys.argv) < 3:
+        args, flags = split_flags(sys.argv[2:], value_flags=("--quant",))
+        if not args:
             print("Error: vector requires an image path")
             sys.exit(1)
-        vector_command(Path(sys.argv[2]))
+        quant = flags.get("--quant")
+        if quant is not None and quant != "int8":
+            print("Error: --quant only supports int8")
+            sys.exit(1)
+        vector_command(Path(args[0]), quant)
+    elif cmd == "vector-batch":
+        if len(sys.argv) < 3:
+            print("Error: vector-batch requires at least one image path")
+            sys.exit(1)
+        vector_batch_command([Path(p) for p in sys.argv[2:]])
+    elif cmd == "serve":
+        args, flags = split_flags(sys.argv[2:], bool_flags=("--socket",))
+        if args and "--socket" not in flags:
+            print("Error: serve only takes a path together with --socket")
+            sys.exit(1)
+        if len(args) > 1:
+            print("Error: serve --socket takes at most one path")
+            sys.exit(1)
+        socket_path = None
+        if "--socket" in flags:
+            socket_path = Path(args[0]) if args else CLIP_SOCKET_PATH
+        serve_command(socket_path)
     elif cmd == "clear-temp":
         days = int(sys.argv[2]) if len(sys.argv) > 2 else 7
         clear_temp(days)
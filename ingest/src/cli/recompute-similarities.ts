@@ -18,7 +18,7 @@ import path from "node:path";
 import fs from "node:fs";
 import { db, runMigrations } from "../database.js";
 import { THUMBNAIL_DIR, SIMILARITY_THRESHOLD } from "../config.js";
-import { extractVector } from "../python-procreate.js";
+import { extractVector, stopVectorWorker } from "../python-procreate.js";
 
 // -----------------------------------------------------------------------------
 // Types
@@ -269,6 +269,8 @@ Environment variables that affect behavior:
   } catch (error) {
     console.error("\n❌ Error:", error);
     process.exit(1);
+  } finally {
+    stopVectorWorker();
   }
 }
 
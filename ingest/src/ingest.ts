@@ -3,6 +3,7 @@ import { db, runMigrations } from "./database.js";
 import { performInitialScan } from "./scan.js";
 import { startWatcher, stopWatcher } from "./watch.js";
 import { resumeProcessing } from "./queue.js";
+import { stopVectorWorker } from "./python-procreate.js";
 
 // -----------------------------------------------------------------------------
 // Initialization
@@ -36,6 +37,7 @@ const watcher = startWatcher();
 function shutdown() {
   console.log("\n[SHUTDOWN] Closing watcher...");
   stopWatcher();
+  stopVectorWorker();
   db.close();
   process.exit(0);
 }
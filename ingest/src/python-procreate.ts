@@ -1,4 +1,4 @@
-import { spawn } from "node:child_process";
+import { spawn, ChildProcessWithoutNullStreams } from "node:child_process";
 import { existsSync } from "node:fs";
 import { resolve, dirname } from "node:path";
 import { fileURLToPath } from "node:url";
@@ -90,18 +90,146 @@ export async function inspectProcreate(filePath: string): Promise<ProcreateMetad
   return parsed as ProcreateMetadata;
 }
 
+// -----------------------------------------------------------------------------
+// Persistent CLIP worker
+// -----------------------------------------------------------------------------
+
+type PendingVector = {
+  resolve: (result: VectorResult) => void;
+  reject: (err: Error) => void;
+  timeout: NodeJS.Timeout;
+  // Worker the request was written to, so a dying worker only fails its own requests
+  proc: ChildProcessWithoutNullStreams;
+};
+
+// Keep only the tail of the worker's stderr for error messages
+const VECTOR_WORKER_STDERR_LIMIT = 16 * 1024;
+
+let vectorWorker: ChildProcessWithoutNullStreams | null = null;
+let vectorRequestId = 0;
+const pendingVectors = new Map<number, PendingVector>();
+
 /**
- * Extract CLIP vector embedding from a thumbnail image.
+ * Spawn (or reuse) a long-lived `serve` process so CLIP is only loaded once.
  */
-export async function extractVector(imagePath: string): Promise<VectorResult> {
-  const stdout = await execPython(["vector", imagePath], 120_000); // CLIP model loading can take time
+function getVectorWorker(): ChildProcessWithoutNullStreams {
+  if (vectorWorker) {
+    return vectorWorker;
+  }
 
-  let parsed: unknown;
+  const proc = spawn(PYTHON_BIN, [PYTHON_SCRIPT, "serve"], {
+    stdio: ["pipe", "pipe", "pipe"],
+  });
+
+  let buffer = "";
+  let stderr = "";
+
+  proc.stdout.on("data", (data) => {
+    buffer += data.toString();
+
+    let newline: number;
+    while ((newline = buffer.indexOf("\n")) !== -1) {
+      const line = buffer.slice(0, newline).trim();
+      buffer = buffer.slice(newline + 1);
+      if (line) {
+        handleVectorResponse(line);
+      }
+    }
+  });
+
+  proc.stderr.on("data", (data) => {
+    stderr += data.toString();
+    if (stderr.length > VECTOR_WORKER_STDERR_LIMIT) {
+      stderr = stderr.slice(-VECTOR_WORKER_STDERR_LIMIT);
+    }
+  });
+
+  const shutdown = (err: Error) => {
+    if (vectorWorker === proc) {
+      vectorWorker = null;
+    }
+    for (const [id, pending] of pendingVectors) {
+      if (pending.proc !== proc) {
+        continue;
+      }
+      clearTimeout(pending.timeout);
+      pending.reject(err);
+      pendingVectors.delete(id);
+    }
+  };
+
+  proc.on("close", (code) => {
+    shutdown(new Error(`Python vector worker exited with code ${code}: ${stderr}`));
+  });
+
+  proc.on("error", (err) => {
+    shutdown(err);
+  });
+
+  // EPIPE if a request is written after the worker died but before "close"
+  proc.stdin.on("error", (err) => {
+    shutdown(err);
+  });
+
+  vectorWorker = proc;
+  return proc;
+}
+
+function handleVectorResponse(line: string) {
+  let parsed: { id?: number; error?: string } & Partial<VectorResult>;
   try {
-    parsed = JSON.parse(stdout);
+    parsed = JSON.parse(line);
   } catch (err) {
-    throw new Error(`Failed to parse Python vector JSON for ${imagePath}\n${stdout}`);
+    console.error(`[ERROR] Failed to parse Python vector worker output\n${line}`);
+    return;
+  }
+
+  const pending = parsed.id !== undefined ? pendingVectors.get(parsed.id) : undefined;
+  if (!pending || parsed.id === undefined) {
+    return;
+  }
+
+  pendingVectors.delete(parsed.id);
+  clearTimeout(pending.timeout);
+
+  if (parsed.error) {
+    pending.reject(new Error(`Python vector worker failed: ${parsed.error}`));
+  } else {
+    pending.resolve(parsed as VectorResult);
   }
+}
+
+/**
+ * Extract CLIP vector embedding from a thumbnail image.
+ */
+export function extractVector(imagePath: string): Promise<VectorResult> {
+  const proc = getVectorWorker();
+  const id = ++vectorRequestId;
 
-  return parsed as VectorResult;
+  return new Promise((resolve, reject) => {
+    // First request includes CLIP model loading, which can take time
+    const timeout = setTimeout(() => {
+      pendingVectors.delete(id);
+      reject(new Error(`Python vector request timed out after 120000ms for ${imagePath}`));
+
+      // A hung worker would stall every later request; kill it so the next call respawns
+      if (vectorWorker === proc) {
+        vectorWorker = null;
+      }
+      proc.kill("SIGTERM");
+    }, 120_000);
+
+    pendingVectors.set(id, { resolve, reject, timeout, proc });
+    proc.stdin.write(JSON.stringify({ id, path: imagePath }) + "\n");
+  });
+}
+
+/**
+ * Stop the persistent CLIP worker, if running.
+ */
+export function stopVectorWorker() {
+  if (vectorWorker) {
+    vectorWorker.stdin.end();
+    vectorWorker = null;
+  }
 }